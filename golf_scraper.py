@@ -1,158 +1,207 @@
-import asyncio, re, pandas as pd
+import asyncio, json, os, re, pandas as pd
+import httpx
+from pathlib import Path
 from playwright.async_api import async_playwright
 from datetime import datetime
 
+from scarper_api import BASE_URL as API_URL, REGION_ID
+
 BASE = ("https://www.golfv2.com/schedule?"
         "_mt=%2Fschedule%2Fdaily%2F48541%3FactiveDate%3D{}")  # 48541 = Tribeca location ID
 
-async def scrape_day(play, date_str: str) -> pd.DataFrame:
-    url = BASE.format(date_str)
-    browser = await play.chromium.launch(
-        headless=False,
-        args=['--disable-blink-features=AutomationControlled']
-    )
-    context = await browser.new_context(
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
-    )
-    page = await context.new_page()
-    
-    
-    print(f"Navigating to: {url}")
-    await page.goto(url)
-    
-    # Take screenshot before cookie handling
-
-    await page.screenshot(path=f'before_cookie_{date_str}.png')
-    
-    # Wait for iframe with increased timeout
-    print("Waiting for iframe to load...")
-    await page.wait_for_selector('iframe[name*="zoid"]', timeout=60000)
-    
-    # Save the page HTML for debugging
-    # html_content = await page.content()
-    # with open(f'page_1sec_{date_str}.html', 'w', encoding='utf-8') as f:
-    #     f.write(html_content)
-        
-    # Get the booking iframe
-    target_frame = None
-    for frame in page.frames:
-        if "zoid" in frame.name and "mariana" in frame.url.lower():
-            target_frame = frame
-            break
-    
-    # if not target_frame:
-    #     raise Exception("Could not find booking iframe")
-        
-    # Wait longer for frame content to load
-    await page.wait_for_timeout(8000)
-
-
-    # Save the frame HTML for debugging
-    frame_html_content = await target_frame.content()  
-    #save html content to file
-    with open(f'frame_1sec_{date_str}.html', 'w', encoding='utf-8') as f:
-        f.write(frame_html_content) 
-
-    # Get date and location info
-    # try:
-    # Extract slot data using more specific class selectors
-    time_elems = await target_frame.query_selector_all('p[class*="BoldLabel"]')
-    location_elems = await target_frame.query_selector_all('p[class*="LineItem"]')
-    status_elems = await target_frame.query_selector_all('p[class*="BoldLabel"][class*="StyledNoWrapLabel"]')
-
-    # Print raw data for debugging
-    for time, loc, status in zip(time_elems, location_elems, status_elems):
-        time_text = await time.text_content()
-        loc_text = await loc.text_content() 
-        status_text = await status.text_content()
-        print(f"Found slot: {time_text} at {loc_text} - {status_text}")
-    # date_elem = await target_frame.wait_for_selector('div[data-testid="date-display"], div[class*="DateDisplay"]', timeout=5000)
-    # location_elem = await target_frame.wait_for_selector('div[data-testid="location-info"], div[class*="LocationInfo"]', timeout=5000)
-    # bay_info_elem = await target_frame.wait_for_selector('div[data-testid="bay-info"], div[class*="BayInfo"]', timeout=5000)
-
-    # displayed_date = await date_elem.text_content() if date_elem else "Date not found"
-    # location = await location_elem.text_content() if location_elem else "Location not found"
-    # bay_info = await bay_info_elem.text_content() if bay_info_elem else "Bay info not found"
-
-    # print(f"\nDate displayed: {displayed_date}")
-    # print(f"Location: {location}")
-    # print(f"Bay information: {bay_info}\n")
-    # # except Exception as e:
-    # # print(f"Error getting page info: {e}")
-
-    # # ...rest of existing code for finding time slots...
-    
-    # Handle cookie consent if present
-    try:
-        cookie_button = await target_frame.wait_for_selector(
-            'button[data-test-button="accept-all-cookies"], [aria-label*="cookie"], [class*="cookie-consent"] button',
-            timeout=5000,
-            state='visible'
-        )
-        if cookie_button:
-            await cookie_button.click()
-            print('Cookie pressed')
-            await page.wait_for_timeout(5000)
-    except Exception as e:
-        print(f"No cookie popup found: {e}")
-    
-    # Take debug screenshot
-    await page.screenshot(path=f'debug_screenshot_{date_str}.png')
-    
-    # Try to find time slots using more specific selectors
-    slots = await target_frame.query_selector_all('div[data-testid*="time-slot"], div[class*="TimeSlot"], div[class*="time-slot"]')
-    
-    if not slots:
-        print("No time slots found, taking full page screenshot for debugging")
-        await page.screenshot(path=f'debug_full_{date_str}.png')
-        return pd.DataFrame()
-        
+CACHEDIR = Path("cache")               # same cache dir scarper_api.py uses
+
+# Cap how many browser contexts scrape at once
+sem = asyncio.Semaphore(5)
+
+async def scrape_day_api(client: httpx.AsyncClient, date_str: str) -> pd.DataFrame:
+    """Fetch one day's slots straight from the Mariana Tek JSON API.
+
+    No browser, no iframe, no label parsing: capacity and
+    available_spot_count come back as structured fields.
+    """
+    params = {
+        "min_start_date": date_str,
+        "max_start_date": date_str,
+        "region": REGION_ID,
+        "page_size": 500,
+        "format": "json",
+    }
+    r = await client.get(API_URL, params=params, timeout=30)
+    r.raise_for_status()
+
     bookings = []
-    for slot in slots:
-        try:
-            time_elem = await slot.query_selector('p[class*="time"], span[class*="time"]')
-            status_elem = await slot.query_selector('p[class*="status"], span[class*="status"]')
-            
-            if time_elem and status_elem:
-                time_text = await time_elem.text_content()
-                status_text = await status_elem.text_content()
-                
-                # Parse time and get booking count
-                time = datetime.strptime(time_text.strip(), '%I:%M %p').time()
-                booked = bookings_from_label(status_text)
-                
-                bookings.append({
-                    'date': date_str,
-                    'time': time,
-                    'status': status_text.strip(),
-                    'booked_bays': booked
-                })
-        except Exception as e:
-            print(f"Error parsing slot: {e}")
-            
+    for cls in r.json()["results"]:
+        start = pd.Timestamp(cls["start_datetime"]).tz_convert("America/New_York")
+        capacity = cls["capacity"]
+        available = cls["available_spot_count"]
+        bookings.append({
+            'date': date_str,
+            'time': start.time(),
+            'status': f"{available}/{capacity} Open",
+            'booked_bays': capacity - available
+        })
     return pd.DataFrame(bookings)
-        
-    # except Exception as e:
-    #     print(f"Error scraping page: {e}")
-    #     await page.screenshot(path=f'debug_error_{date_str}.png')
-    #     return pd.DataFrame()
-        
-    # finally:
-    await browser.close()
+
+def _scrape_cache_path(date_str: str) -> Path:
+    """
+    Deterministic cache file for one scraped day, mirroring cache_get in
+    scarper_api.py.  Past days never change so they cache forever;
+    today's schedule churns, so it gets a 15-minute bucket; future days
+    get an hourly bucket.
+    """
+    now = datetime.utcnow()
+    today = now.strftime("%Y-%m-%d")
+    if date_str < today:
+        bucket = "final"
+    elif date_str == today:
+        bucket = f"{now:%Y%m%d%H}q{now.minute // 15}"
+    else:
+        bucket = f"{now:%Y%m%d%H}"
+    return CACHEDIR / f"{date_str}_{REGION_ID}_{bucket}.json"
+
+async def scrape_day(browser, date_str: str) -> pd.DataFrame:
+    cache_path = _scrape_cache_path(date_str)
+    if cache_path.exists():
+        print(f"Cache hit for {date_str}: {cache_path.name}")
+        return pd.read_json(cache_path)
+
+    async with sem:
+        url = BASE.format(date_str)
+        context = await browser.new_context(
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
+        )
+        try:
+            # Abort resources that don't affect the slot DOM; fewer bytes
+            # over the wire and less renderer work per context
+            async def _block(route):
+                if route.request.resource_type in ("image", "font", "stylesheet", "media"):
+                    await route.abort()
+                else:
+                    await route.continue_()
+            await context.route("**/*", _block)
+
+            page = await context.new_page()
+
+
+            print(f"Navigating to: {url}")
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+
+            # Take screenshot before cookie handling (debug only; screenshots
+            # force a full render + large disk write)
+            if os.getenv("GOLF_DEBUG"):
+                await page.screenshot(path=f'before_cookie_{date_str}.png')
+
+            # Wait for iframe with increased timeout
+            print("Waiting for iframe to load...")
+            await page.wait_for_selector('iframe[name*="zoid"]', timeout=60000)
+
+            # Save the page HTML for debugging
+            # html_content = await page.content()
+            # with open(f'page_1sec_{date_str}.html', 'w', encoding='utf-8') as f:
+            #     f.write(html_content)
+
+            # Get the booking iframe
+            target_frame = None
+            for frame in page.frames:
+                if "zoid" in frame.name and "mariana" in frame.url.lower():
+                    target_frame = frame
+                    break
+
+            # if not target_frame:
+            #     raise Exception("Could not find booking iframe")
+
+            # Wait for slot markup instead of sleeping a fixed 8s
+            await target_frame.wait_for_selector(
+                'p[class*="BoldLabel"], div[class*="TimeSlot"]', timeout=30000)
+
+
+            # Save the frame HTML for debugging (written off the event
+            # loop so sibling days keep scraping)
+            if os.getenv("GOLF_DEBUG"):
+                frame_html_content = await target_frame.content()
+                await asyncio.to_thread(
+                    Path(f'frame_1sec_{date_str}.html').write_bytes,
+                    frame_html_content.encode("utf-8"))
+
+            # Handle cookie consent if present
+            try:
+                cookie_button = await target_frame.wait_for_selector(
+                    'button[data-test-button="accept-all-cookies"], [aria-label*="cookie"], [class*="cookie-consent"] button',
+                    timeout=5000,
+                    state='visible'
+                )
+                if cookie_button:
+                    await cookie_button.click()
+                    print('Cookie pressed')
+            except Exception as e:
+                print(f"No cookie popup found: {e}")
+
+            # Take debug screenshot
+            if os.getenv("GOLF_DEBUG"):
+                await page.screenshot(path=f'debug_screenshot_{date_str}.png')
+
+            # Pull every slot's text in ONE call into the browser process
+            # instead of two query_selector round-trips per slot
+            rows = await target_frame.evaluate("""() => {
+              const slots = document.querySelectorAll(
+                'div[data-testid*="time-slot"], div[class*="TimeSlot"], div[class*="time-slot"]');
+              return Array.from(slots).map(s => ({
+                time:   s.querySelector('p[class*="time"], span[class*="time"]')?.innerText ?? '',
+                status: s.querySelector('p[class*="status"], span[class*="status"]')?.innerText ?? '',
+              }));
+            }""")
+
+            if not rows:
+                print("No time slots found, taking full page screenshot for debugging")
+                await page.screenshot(path=f'debug_full_{date_str}.png')
+                return pd.DataFrame()
+
+            bookings = []
+            for row in rows:
+                try:
+                    time_text, status_text = row['time'], row['status']
+                    if time_text and status_text:
+                        print(f"Found slot: {time_text} - {status_text}")
+
+                        # Parse time and get booking count
+                        time = datetime.strptime(time_text.strip(), '%I:%M %p').time()
+                        booked = bookings_from_label(status_text)
+
+                        bookings.append({
+                            'date': date_str,
+                            'time': time,
+                            'status': status_text.strip(),
+                            'booked_bays': booked
+                        })
+                except Exception as e:
+                    print(f"Error parsing slot: {e}")
+
+            CACHEDIR.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(
+                cache_path.write_text, json.dumps(bookings, default=str))
+
+            return await asyncio.to_thread(pd.DataFrame, bookings)
+        finally:
+            await context.close()
+
+# Compiled once; bookings_from_label runs per slot
+_OPEN_RE = re.compile(r'(\d+)\s*/\s*(\d+)\s*open', re.I)
+_HALF_OPEN = "(1/2 open)"
 
 def bookings_from_label(text: str) -> int:
     text = text.lower()
     if "waitlist" in text:
         return 4  # all bays taken
-    
-    m = re.search(r'(\d+)\s*/\s*(\d+)\s*open', text, re.I)
+
+    m = _OPEN_RE.search(text)
     if not m:
-        if "(1/2 open)" in text.lower():
+        if _HALF_OPEN in text:
             return 2  # private event took 2 bays
         return 0  # safety fallback
-        
-    open_cnt, total = map(int, m.groups())
-    
+
+    open_cnt, total = int(m[1]), int(m[2])
+
     if total == 4:  # e.g. "3/4 Open"
         return 4 - open_cnt
     elif total == 2:  # e.g. "(1/2 Open)" → 2 bays booked privately
@@ -160,29 +209,49 @@ def bookings_from_label(text: str) -> int:
     return 0
 
 async def main():
-    async with async_playwright() as play:
-        # Scrape next 7 days
-        days = [(pd.Timestamp.now() + pd.Timedelta(days=i)).strftime("%Y-%m-%d") 
-                for i in range(7)]
-                
-        #Testing: uncomment below
-        days = days[0:1]
-        print(f"Scraping days: {', '.join(days)}\n")
-        frames = []
-        for day in days:
-            print(f"\nScraping {day}...")
-            df = await scrape_day(play, day)
-            frames.append(df)
-            
+    # Scrape next 7 days
+    days = [(pd.Timestamp.now() + pd.Timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range(7)]
+
+    #Testing: uncomment below
+    # days = days[0:1]
+    print(f"Scraping days: {', '.join(days)}\n")
+
+    if os.getenv("GOLF_USE_BROWSER"):
+        # Fallback: drive a real browser (slow, but survives API changes)
+        async with async_playwright() as play:
+            # One browser for the whole window; days share it concurrently
+            browser = await play.chromium.launch(
+                headless=True,
+                args=['--disable-blink-features=AutomationControlled']
+            )
+            try:
+                results = await asyncio.gather(*(scrape_day(browser, d) for d in days),
+                                               return_exceptions=True)
+            finally:
+                await browser.close()
+    else:
+        # Default: hit the JSON API directly, one shared client for all days
+        async with httpx.AsyncClient() as client:
+            results = await asyncio.gather(*(scrape_day_api(client, d) for d in days),
+                                           return_exceptions=True)
+
+    frames = []
+    for day, res in zip(days, results):
+        if isinstance(res, Exception):
+            print(f"Error scraping {day}: {res}")
+        else:
+            frames.append(res)
+
     if frames:
         df = pd.concat(frames, ignore_index=True)
-        
+
         # Calculate daily utilization
         summary = (df.groupby("date")["booked_bays"]
                     .agg(['sum', 'count'])
                     .eval('utilization = sum / (count * 4)')
                     .round(3))
-                    
+
         print("\nDaily Bay Utilization:")
         print(summary[['utilization']])
 